@@ -44,6 +44,74 @@ import argparse
 import re
 import gzip
 import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+
+# One single regular expression matching the lines that give us a date.
+# The outer named group tells which kind of line has been matched:
+#  ts : 20:52:29 (lmgrd) TIMESTAMP 1/23/2012
+#  st : 8:21:20 (lmgrd) FLEXnet Licensing (v10.8.0 build 18869) started on MACHINE (IBM PC) (7/30/2012)
+# Event lines are split with str methods instead (see read_files()).
+_RE_DATE = re.compile(r'(?P<ts>\ ?\d+:\d+:\d+ .+ TIMESTAMP (\d+)/(\d+)/(\d+))'
+                      r'|(?P<st>\ ?\d+:\d+:\d+ .+ \((\d+)/(\d+)/(\d+)\))')
+
+
+# License states as stored in the events list. The state read in the log file
+# is converted once, so that the statistics only compare integers. Each code
+# is also the change it brings to the number of licenses in use.
+STATE_IN = -1
+STATE_OUT = 1
+STATE_OTHER = 0  # DENIED, UNSUPPORTED, ...
+_STATE_CODES = {'in': STATE_IN, 'out': STATE_OUT}
+
+
+def _is_word(string):
+    """Tells whether string is made of word characters only (as \\w+
+    would match it in a regular expression).
+    """
+
+    return string.replace('_', 'a').isalnum()
+
+# End of _is_word() function
+
+
+# Number of lines buffered (all modules together) before writing them to the
+# gnuplot data files.
+_DAT_BUFFER_LINES = 100000
+
+
+# Dates are packed into an int (year * 10000 + month * 100 + day) so that
+# comparing them is a single integer comparison. 0 is an unknown date.
+UNKNOWN_DATE = 0
+
+
+def _pack_date(year, month, day):
+    """Packs a date given as strings of digits into an int.
+    """
+
+    return int(year) * 10000 + int(month) * 100 + int(day)
+
+# End of _pack_date() function
+
+
+@lru_cache(maxsize=None)
+def _format_date(date):
+    """Formats a packed date like this : year/month/day. Each date is
+    formatted only once.
+    """
+
+    if date == UNKNOWN_DATE:
+        return '??/??/????'
+
+    return '%d/%d/%d' % (date // 10000, date // 100 % 100, date % 100)
+
+# End of _format_date() function
 
 
 class Options:
@@ -102,173 +170,290 @@ class Options:
 # End of Options class
 
 
-def read_files(files):
-    """Matches lines in the files and returns the number of days in use and a
-    list of the following tuple : (date, time, state, module, user, machine).
+class LogFiles:
+    """
+    A class to read the events of the log files. Iterating over it yields
+    the events one by one, so that they never are all in memory at once.
+    The number of days and of events are known once the iteration is over.
+    When several files are given they are parsed in parallel, one per
+    process, and then all the events of the files being parsed or waiting
+    to be yielded (up to one more file than there are processes) are in
+    memory.
     """
 
-# 8:21:20 (lmgrd) FLEXnet Licensing (v10.8.0 build 18869) started on MACHINE (IBM PC) (7/30/2012)
+    files = []           # file list that we will read looking for entries
+    nb_days = 0          # Total number of days seen in the log files
+    nb_events = 0        # Total number of events read in the log files
+    start_events = None  # Events dated upon the starting date of a single file (see _read_files())
 
-    result_list = []
-    nb_days = 0
-    date_matched = False
+    def __init__(self, files):
+        """
+        Inits the class
+        """
+        self.files = files
+        self.nb_days = 0
+        self.nb_events = 0
+        self.start_events = None
 
-    # Reading each file here, one after the other.
-    for a_file in files:
+    # End of init() function
 
-        # Openning the files with gzip if they end with .gz, in normal mode
-        # if not. Do we need bz2 ? May be we should do this with a magic number
-        if '.gz' in a_file:
-            inode = gzip.open(a_file, 'r')
+
+    def __iter__(self):
+        """
+        Yields the following tuple for each event of the files :
+        (date, time, state, module, user, machine).
+        state is one of STATE_IN, STATE_OUT or STATE_OTHER.
+        """
+
+        nb_workers = min(len(self.files), os.cpu_count() or 1)
+
+        if nb_workers > 1:
+            return self._read_files_in_parallel(nb_workers)
         else:
-            inode = open(a_file, 'r')
+            return self._read_files()
 
-        date = '??/??/????'  # Some unknown date
-        old_date = ''
+    # End of __iter__() function
 
-        for line in inode:
-            # Looking for some patterns in the file
 
-            if date_matched is False:
-                # Look for the line below to guess the starting date (here : 2012/7/30)
-                # 8:21:20 (lmgrd) FLEXnet Licensing (v10.8.0 build 18869) started on MACHINE (IBM PC) (7/30/2012)
-                res = re.match(r'\ ?\d+:\d+:\d+ .+ \((\d+)/(\d+)/(\d+)\)', line)
-                if res:
-                    # Formating like this : year/month/day
-                    date = '%s/%s/%s' % (res.group(3), res.group(1), res.group(2))
-                    date_matched = True
+    def _read_files_in_parallel(self, nb_workers):
+        """
+        Parses the files in nb_workers processes and yields their events,
+        file after file in the order the files were given.
 
-            # 11:50:22 (orglab) OUT: "Origin7" user@MACHINE-NAME
-            res = re.match(r'\ ?(\d+:\d+:\d+) .+ (\w+): "(.+)" (\w+)@(.+)', line)
-            if res:
-                # I put the results in variables for clarity
-                time = res.group(1)
-                state = res.group(2)
-                module = res.group(3)
-                user = res.group(4)
-                machine = res.group(5)
-                result_list.append((date, time, state, module, user, machine))
-            else:
-                # Trying this patern instead :
-                # 20:52:29 (lmgrd) TIMESTAMP 1/23/2012
-                res = re.match(r'\ ?\d+:\d+:\d+ .+ TIMESTAMP (\d+)\/(\d+)\/(\d+)', line)
-                if res:
-                    # Formating like this : year/month/day
-                    date = '%s/%s/%s' % (res.group(3), res.group(1), res.group(2))
-                    if date != old_date:
-                        nb_days = nb_days + 1
-                        old_date = date
+        A file is only submitted when the events of a previous one have been
+        yielded, so that at most nb_workers files are parsed ahead of the
+        one being yielded and their events kept in memory.
+        """
 
-        inode.close()
+        self.nb_days = 0
+        self.nb_events = 0
 
-    # Returning the total number of days seen in the log file and the
-    # list containing all tuples
-    return (nb_days, result_list)
+        # Only the first starting date found in all files is used (see
+        # _read_files()). Each worker does not know about the other files and
+        # dates its events upon the starting date of its own file.
+        date_matched = False
 
-# End of read_files() function
+        with ProcessPoolExecutor(max_workers=nb_workers) as executor:
+            pending = deque(executor.submit(_parse_one, a_file) for a_file in self.files[:nb_workers])
+            next_file = len(pending)
 
+            while pending:
+                (nb_days, start_events, events) = pending.popleft().result()
 
-def get_stats_from_module(stats, module_list, module):
-    """Returns the tuple corresponding to the module
-    from stats dictionary and takes care to create one
-    if its a new module.
-    """
+                if next_file < len(self.files):
+                    pending.append(executor.submit(_parse_one, self.files[next_file]))
+                    next_file = next_file + 1
 
-    if module not in module_list:
-        module_list.append(module)
-        stats[module] = (0, 999999999999, '', 0, 0, 0, 'XXXXXXX')
+                if start_events is not None:
+                    if date_matched:
+                        # Dating these events back as if the starting date
+                        # had not been seen in this file.
+                        (first, end, date) = start_events
+                        events[first:end] = [(date, ) + event[1:] for event in events[first:end]]
+                    date_matched = True
 
-    return stats[module]
+                self.nb_days = self.nb_days + nb_days
+                self.nb_events = self.nb_events + len(events)
+                yield from events
 
-# End of get_stats_from_module() function
+    # End of _read_files_in_parallel() function
 
 
-def count_users_upon_state(state, nb_users, total_use):
-    """Counts the maximum number of users and the number
-    of usage made upon the state of the license IN or OUT
-    Returns updated nb_users and total_use in a tuple
-    """
+    def _read_files(self):
+        """
+        Matches lines in the files, one after the other, and yields the
+        events.
+
+        The starting date of the first file where one is found dates the
+        events until the next TIMESTAMP. When there is only one file (as in
+        _parse_one()) the events it dated are recorded in start_events as
+        (first event, event after the last one, date they would have had
+        otherwise), indices counting from 0, so that they can be dated back
+        if a previous file already had a starting date.
+        """
+
+        nb_days = 0
+        nb_events = 0
+        date_matched = False
+        record_start = len(self.files) == 1
+        start_end = None
+        self.start_events = None
+
+        # Reading each file here, one after the other.
+        for a_file in self.files:
+
+            # Decompressing the files with gzip if they end with .gz, reading them
+            # in normal mode if not. Do we need bz2 ? May be we should do this
+            # with a magic number
+            if '.gz' in a_file:
+                # Decompressing and decoding the whole file at once is much
+                # cheaper than going line per line through gzip's text wrapper.
+                # Newlines are translated as open() does for plain files (and
+                # str.splitlines() would also split on other characters).
+                inode = open(a_file, 'rb')
+                text = gzip.decompress(inode.read()).decode('utf-8', 'replace')
+                lines = text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+            else:
+                # Plain files are streamed line per line: this keeps memory use
+                # constant and is faster than decoding a mmap()ed copy at once.
+                inode = open(a_file, 'r', encoding='utf-8', errors='replace')
+                lines = inode
+
+            date = UNKNOWN_DATE
+            old_date = UNKNOWN_DATE
+
+            for line in lines:
+                # Looking for some patterns in the file. Cheap substring tests
+                # first: most lines are noise and can not match any pattern.
+                if ': "' in line and '@' in line:
+                    # 11:50:22 (orglab) OUT: "Origin7" user@MACHINE-NAME
+                    # Splitting the line on its fixed punctuation is much faster
+                    # than a regex and gives the same fields.
+                    (time, _, rest) = line.lstrip().partition(' ')
+                    (_, _, rest) = rest.partition(') ')
+                    (state, _, rest) = rest.partition(': "')
+                    (module, _, rest) = rest.partition('" ')
+                    (user, _, machine) = rest.partition('@')
+                    machine = machine.rstrip()
+
+                    if _is_word(state) and module and _is_word(user) and machine:
+                        state = _STATE_CODES.get(state.lower(), STATE_OTHER)
+                        nb_events = nb_events + 1
+                        yield (date, time, state, module, user, machine)
+                        continue
+
+                if not (' TIMESTAMP ' in line or (date_matched is False and '/' in line)):
+                    continue
+
+                res = _RE_DATE.match(line)
+                if res is None:
+                    continue
+
+                kind = res.lastgroup
+
+                if kind == 'ts':
+                    # 20:52:29 (lmgrd) TIMESTAMP 1/23/2012
+                    date = _pack_date(res.group(4), res.group(2), res.group(3))
+                    if date != old_date:
+                        nb_days = nb_days + 1
+                        old_date = date
+                    if start_end is None and self.start_events is not None:
+                        start_end = nb_events
+
+                elif date_matched is False:
+                    # Look for the line below to guess the starting date (here : 2012/7/30)
+                    # 8:21:20 (lmgrd) FLEXnet Licensing (v10.8.0 build 18869) started on MACHINE (IBM PC) (7/30/2012)
+                    if record_start:
+                        self.start_events = (nb_events, None, date)
+                    date = _pack_date(res.group(8), res.group(6), res.group(7))
+                    date_matched = True
 
-    if state.lower() == 'out':
-        nb_users = nb_users + 1
-        total_use = total_use + 1
+            inode.close()
 
-    elif state.lower() == 'in':
-        nb_users = nb_users - 1
+            self.nb_days = nb_days
+            self.nb_events = nb_events
 
-    return (nb_users, total_use)
+        if self.start_events is not None:
+            (first, end, date) = self.start_events
+            self.start_events = (first, nb_events if start_end is None else start_end, date)
 
-# End of count_users_upon_state() function
+    # End of _read_files() function
+# End of LogFiles class
 
 
-def get_min_max_users(nb_users, min_users, max_users, date, max_day):
-    """Gets the maximum and the minimum users usage
-    Returns updated (or not) min_users, max_users and
-    max_day in a tuple
+def _parse_one(a_file):
+    """Reads all the events of one log file. This is run in a worker process
+    when several files are given. Returns the number of days seen in the file,
+    the events dated upon its starting date (see LogFiles._read_files()) and
+    the list of its events.
     """
 
-    if nb_users > 0 and nb_users > max_users:
-        max_users = nb_users
-        max_day = date
+    log_file = LogFiles([a_file])
 
-    if nb_users >= 0 and nb_users < min_users:
-        min_users = nb_users
+    # Module, user and machine names repeat a lot: interning them makes
+    # pickle send each of them only once back to the main process.
+    intern = sys.intern
+    events = [(date, time, state, intern(module), intern(user), intern(machine))
+              for (date, time, state, module, user, machine) in log_file]
 
-    return (min_users, max_users, max_day)
+    return (log_file.nb_days, log_file.start_events, events)
 
-# End of get_min_max_users() function
+# End of _parse_one() function
 
 
-def do_some_stats(result_list):
+def do_some_stats(events):
     """Here we do some stats and fill a dictionnary of stats that will
-    contain all stats per module ie one tuple containing the following :
-    (max_users, min_users, max_day, nb_users, total_use, nb_days).
+    contain all stats per module ie one list containing the following :
+    (max_users, min_users, max_day, nb_users, total_use, nb_days, old_date).
+    Dates are packed ints (see _pack_date()).
 
-    Returns a dictionnary of statistics and a list of module that has stats.
-    """
+    Everything is done inline in the loop, updating the list of the module
+    in place, as this loop runs once per event.
 
-    old_date = 'XXXXXXX'  # A value that does not exists
-    # nb_days = 0           # Total number of days of use
+    Returns a dictionnary of statistics. Modules are kept in the order they
+    first appear in the log files (dictionnaries keep insertion order).
+    """
 
-    module_list = []
-    stats = dict()  # Tuple dictionnary : (max_users, min_users, max_day, nb_users, total_use, nb_days)
+    stats = dict()  # List dictionnary : [max_users, min_users, max_day, nb_users, total_use, nb_days, old_date]
     stats_dedup = set()
 
-    for data in result_list:
-        (date, time, state, module, user, machine) = data
+    for (date, time, state, module, user, machine) in events:
 
-        if deduplicate(stats_dedup, state, module, user, machine):
-            continue
+        # Deduplicate licenses checked out by the same user on the same machine
+        if state == STATE_OUT:
+            module_user_machine = (module, user, machine)
+            if module_user_machine in stats_dedup:
+                continue
+            stats_dedup.add(module_user_machine)
 
-        # Retrieving usage values for a specific module
-        (max_users, min_users, max_day, nb_users, total_use, nb_days, old_date) = get_stats_from_module(stats, module_list, module)
+        elif state == STATE_IN:
+            module_user_machine = (module, user, machine)
+            if module_user_machine not in stats_dedup:
+                continue
+            stats_dedup.remove(module_user_machine)
+
+        # Retrieving usage values for a specific module (one single lookup)
+        module_stats = stats.get(module)
+        if module_stats is None:
+            module_stats = [0, 999999999999, UNKNOWN_DATE, 0, 0, 0, -1]  # -1 is a date that does not exists
+            stats[module] = module_stats
 
         # Calculating statistics
-        if date != old_date and state.lower() == 'out':
-            nb_days = nb_days + 1
-            old_date = date
+        nb_users = module_stats[3] + state
+        module_stats[3] = nb_users
+
+        if state == STATE_OUT:
+            module_stats[4] += 1       # total_use
+            if date != module_stats[6]:
+                module_stats[5] += 1   # nb_days
+                module_stats[6] = date
 
-        (nb_users, total_use) = count_users_upon_state(state, nb_users, total_use)
-        (min_users, max_users, max_day) = get_min_max_users(nb_users, min_users, max_users, date, max_day)
+        # Maximum and minimum users usage
+        if nb_users > 0 and nb_users > module_stats[0]:
+            module_stats[0] = nb_users
+            module_stats[2] = date
 
-        # Saving the new values into the corresponding module
-        stats[module] = (max_users, min_users, max_day, nb_users, total_use, nb_days, old_date)
+        if nb_users >= 0 and nb_users < module_stats[1]:
+            module_stats[1] = nb_users
 
-    return (stats, module_list)
+    return stats
 
 # End of do_some_stats function
 
 
-def print_stats(nb_days, stats, name_list):
+def print_stats(nb_days, stats):
     """Prints the stats module per module to the screen.
     """
 
-    for name in name_list:
-        (max_users, min_users, max_day, nb_users, total_use, nb_use_days, date) = stats[name]
+    for (name, module_stats) in stats.items():
+        (max_users, min_users, max_day, nb_users, total_use, nb_use_days, date) = module_stats
 
         print('Module %s :' % name)
         print(' Number of users per day :')
-        print('  max : %d (%s)' % (max_users, max_day))
+        if max_users > 0:
+            print('  max : %d (%s)' % (max_users, _format_date(max_day)))
+        else:
+            print('  max : %d ()' % max_users)
 
         if max_users == 0:
             min_users = 0
@@ -284,60 +469,30 @@ def print_stats(nb_days, stats, name_list):
 # End of print_stats function
 
 
-def output_stats(nb_days, result_list):
-    """Does some stats on the result list and prints them on the screen.
-    """
-
-    (stats, name_list) = do_some_stats(result_list)
-    print_stats(nb_days, stats, name_list)
-
-# End of output_stats
-
-
-def init_use_upon_state(state):
-    """Inits use variable upon the first state we
-    encounter. We normally should only encounter
-    a OUT state but it might not be the case in
-    real life so a IN state fixes use at 0.
-    """
-
-    use = 0
-    if state.lower() == 'out':
-        use = 1
-    elif state.lower == 'in':
-        use = 0
-
-    return use
-
-# End of init_use_upon_state() function
-
-
-def update_use_value_upon_state(state, use):
-    """updates use variable upon state content:
-    OUT adds a usage an IN removes a usage.
+def output_stats(log_files):
+    """Does some stats on the events of the log files and prints them on the
+    screen.
     """
 
-    if state.lower() == 'out':
-        use = use + 1
-    elif state.lower() == 'in':
-        use = use - 1
+    stats = do_some_stats(log_files)
 
-    return use
+    if log_files.nb_events > 1:
+        print_stats(log_files.nb_days, stats)
 
-# End of update_use_value_upon_state() function
+# End of output_stats
 
 
 def deduplicate(stats_dedup, state, module, user, machine):
     """Deduplicate licenses checked out by the same user on the same
     machine."""
 
-    module_user_machine = module + ":" + user + "@" + machine
-    if state.lower() == "out":
+    module_user_machine = (module, user, machine)
+    if state == STATE_OUT:
         if module_user_machine in stats_dedup:
             return True
         else:
             stats_dedup.add(module_user_machine)
-    elif state.lower() == "in":
+    elif state == STATE_IN:
         if module_user_machine in stats_dedup:
             stats_dedup.remove(module_user_machine)
         else:
@@ -348,107 +503,146 @@ def deduplicate(stats_dedup, state, module, user, machine):
 # End of deduplicate() function
 
 
-def do_gnuplot_stats(result_list):
+def _flush_dat_files(buffers, data_dir, created):
+    """Appends the buffered lines of each module to its data file and empties
+    the buffers. Files are only opened for the time of the write, so that
+    the number of modules is not limited by the number of open files.
+    created is the set of modules whose data file already exists.
+    """
+
+    for (module, lines) in buffers.items():
+        if lines:
+            mode = 'a' if module in created else 'w'
+            dat_file = open(os.path.join(data_dir, '%s.dat' % module), mode)
+            dat_file.write(''.join(lines))
+            dat_file.close()
+            created.add(module)
+            lines.clear()
+
+# End of _flush_dat_files() function
+
+
+def do_gnuplot_stats(events, data_dir):
     """Here we do some gnuplot style stats in order to create a report of the
     evolution of the use of the modules.
 
-    event_list contains the date, time and number of used licenses in reverse
-    chronological order.
+    Each event gives a line containing the date, time and number of used
+    licenses in the data file of its module (named upon the module name,
+    in data_dir). Lines are buffered per module and written in batches of
+    _DAT_BUFFER_LINES lines.
+
+    Returns a dictionnary of the number of used licenses, one per module.
     """
 
-    module_list = []
     stats = dict()
+    buffers = dict()
+    created = set()
+    nb_buffered = 0
     stats_dedup = set()
 
-    for data in result_list:
+    for data in events:
         (date, time, state, module, user, machine) = data
 
         if deduplicate(stats_dedup, state, module, user, machine):
             continue
 
-        if module not in module_list:
-            module_list.append(module)
-            stats[module] = []   # Creating an empty list of tuples for this new module.
+        lines = buffers.get(module)
+        if lines is None:
+            lines = []
+            buffers[module] = lines
 
-        event_list = stats[module]
+        # The state is the change it brings to the number of used licenses.
+        # The first event of a module is never an IN as it would have been
+        # deduplicated.
+        use = stats.get(module, 0) + state
+        stats[module] = use
+        lines.append(f'{_format_date(date)} {time} {use}\n')
 
-        if event_list == []:
-            use = init_use_upon_state(state)
-        else:
-            (some_date, some_time, use) = event_list[0]  # retrieving the last 'use' value to update it
-            use = update_use_value_upon_state(state, use)
+        nb_buffered = nb_buffered + 1
+        if nb_buffered >= _DAT_BUFFER_LINES:
+            _flush_dat_files(buffers, data_dir, created)
+            nb_buffered = 0
 
-        event_list.insert(0, (date, time, use))  # Prepending to the list
-        stats[module] = event_list
+    _flush_dat_files(buffers, data_dir, created)
 
-    return (stats, module_list)
+    return stats
 
 # End of do_gnuplot_stats function
 
 
-def print_gnuplot(report_name, nb_days, stats, module_list, data_dir):
-    """Writing the data files and the gnuplot script.
+def print_gnuplot(report_name, nb_days, stats, data_dir):
+    """Writing the gnuplot script.
     """
 
-    # Generating the gnuplot script
-    gnuplot_file = open(os.path.join(data_dir, 'gnuplot.script'), 'w')
+    # Generating the gnuplot script line per line, then writing it at once
+    script = ['# Gnuplot settings.',
+              'set key right',
+              'set grid',
+              'set title "FlexLm - %s" noenhanced' % report_name,
+              'set xdata time',
+              'set timefmt "%Y/%m/%d %H:%M:%S"',
+              'set format x "%Y/%m/%d %H:%M:%S"',
+              'set xlabel "Date, Time"',
+              'set xtics rotate',
+              'set ylabel "Number of licenses in use"',
+              'set ytics 1',
+              'set output "%s.pdf"' % report_name,
+              'set style line 1 lt 1 lw 2 pt 7 ps 0.5',
+              'set terminal pdf size 29.7 cm, 21.0 cm  # PDF output in A4 format',
+              '']
+
+    # Data files names are based upon the module name being analysed.
+    script.append('# All license features on one page.')
+    script.append('plot ' + ', \\\n'.join([f'"{m}.dat" using 1:3 title "{m}" noenhanced with lines' for m in stats]))
 
-    gnuplot_file.write('# Gnuplot settings.\n')
-    gnuplot_file.write('set key right\n')
-    gnuplot_file.write('set grid\n')
-    gnuplot_file.write('set title "FlexLm - %s" noenhanced\n' % report_name)
-    gnuplot_file.write('set xdata time\n')
-    gnuplot_file.write('set timefmt "%Y/%m/%d %H:%M:%S"\n')
-    gnuplot_file.write('set format x "%Y/%m/%d %H:%M:%S"\n')
-    gnuplot_file.write('set xlabel "Date, Time"\n')
-    gnuplot_file.write('set xtics rotate\n')
-    gnuplot_file.write('set ylabel "Number of licenses in use"\n')
-    gnuplot_file.write('set ytics 1\n')
-    gnuplot_file.write('set output "%s.pdf"\n' % report_name)
-    gnuplot_file.write('set style line 1 lt 1 lw 2 pt 7 ps 0.5\n')
-    gnuplot_file.write('set terminal pdf size 29.7 cm, 21.0 cm  # PDF output in A4 format\n')
-
-    first_line = True
-
-    # Generating data files. Their names are based upon the module name being analysed.
-    gnuplot_file.write('\n# All license features on one page.\n')
-    gnuplot_file.write('plot ')
-    for m in module_list:
-        dat_filename = '%s.dat' % m
-        dat_file = open(os.path.join(data_dir, dat_filename), 'w')
-
-        if first_line:
-            gnuplot_file.write('"%s" using 1:3 title "%s" noenhanced with lines' % (dat_filename, m))
-            first_line = False
-        else:
-            gnuplot_file.write(', \\\n"%s" using 1:3 title "%s" noenhanced with lines' % (dat_filename, m))
+    # Generate one page per license feature in the output PDF.
+    script.append('# One page per license feature.')
+    script.append('set xrange [GPVAL_X_MIN:GPVAL_X_MAX]')
+    script.extend([f'plot "{m}.dat" using 1:3 title "{m}" noenhanced with linespoints linestyle 1' for m in stats])
 
-        event_list = stats[m]
-        event_list.reverse()  # We have to reverse the list as we prepended elements
+    gnuplot_file = open(os.path.join(data_dir, 'gnuplot.script'), 'w')
+    gnuplot_file.write('\n'.join(script))
+    gnuplot_file.close()
 
-        for event in event_list:
-            (date, time, use) = event
-            dat_file.write('%s %s %d\n' % (date, time, use))
+# End of print_gnuplot() function
 
-        dat_file.close()
 
-    # Generate one page per license feature in the output PDF.
-    gnuplot_file.write('\n# One page per license feature.')
-    gnuplot_file.write('\nset xrange [GPVAL_X_MIN:GPVAL_X_MAX]')
-    for m in module_list:
-        dat_filename = '%s.dat' % m
-        gnuplot_file.write('\nplot "%s" using 1:3 title "%s" noenhanced with linespoints linestyle 1' % (dat_filename, m))
+def output_gnuplot(report_name, log_files):
+    """Does some stats and outputs them into some data files and a gnuplot script,
+    then runs gnuplot to generate the report.
+    """
 
-# End of print_gnuplot() function
+    # Report directory.
+    report_dir = report_name + '_report'
+    # Data directory.
+    data_dir = os.path.join(report_dir, 'data')
 
+    # Data files are first written to a temporary directory and only moved
+    # to the data directory when a report is generated: nothing is left
+    # behind otherwise. It is created next to the report directory so that
+    # nothing is written elsewhere and moving the files is a mere rename.
+    tmp_dir = tempfile.mkdtemp(prefix='.flexlm_analysis_', dir=os.path.dirname(report_dir) or '.')
 
-def output_gnuplot(report_name, nb_days, result_list, data_dir):
-    """Does some stats and outputs them into some data files and a gnuplot script
-    that one might run later.
-    """
+    try:
+        stats = do_gnuplot_stats(log_files, tmp_dir)
 
-    (stats, module_list) = do_gnuplot_stats(result_list)
-    print_gnuplot(report_name, nb_days, stats, module_list, data_dir)
+        # We do not want to generate a report if the number of day usage is less than one !
+        if log_files.nb_events > 1 and log_files.nb_days > 0:
+            os.makedirs(data_dir, exist_ok=True)
+            for m in stats:
+                dat_filename = '%s.dat' % m
+                shutil.move(os.path.join(tmp_dir, dat_filename), os.path.join(data_dir, dat_filename))
+            # Generate the script for gnuplot.
+            print_gnuplot(report_name, log_files.nb_days, stats, data_dir)
+            # Run gnuplot to generate the report (no shell involved).
+            subprocess.run(['gnuplot', 'gnuplot.script'], cwd=data_dir, check=True)
+            # Move the report to the report directory.
+            # gnuplot writes it relative to data_dir, unless report_name is an
+            # absolute path, and only its basename is kept (as mv did).
+            os.replace(os.path.join(data_dir, report_name + '.pdf'), os.path.join(report_dir, os.path.basename(report_name) + '.pdf'))
+
+    finally:
+        shutil.rmtree(tmp_dir)
 
 # End of output_gnuplot() function
 
@@ -460,28 +654,14 @@ def main():
     # Parsing options
     my_opts = Options()
 
-    (nb_days, result_list) = read_files(my_opts.files)
-
-    if len(result_list) > 1:
+    # Events are read from the files while the stats are being done
+    log_files = LogFiles(my_opts.files)
 
-        if my_opts.out == 'stat':
-            output_stats(nb_days, result_list)
+    if my_opts.out == 'stat':
+        output_stats(log_files)
 
-        # We do not want to generate a report if the number of day usage is less than one !
-        elif my_opts.out == 'gnuplot' and nb_days > 0:
-            report = my_opts.report
-            # Report directory.
-            report_dir = report + '_report'
-            os.makedirs(report_dir, exist_ok=True)
-            # Data directory.
-            data_dir = os.path.join(report_dir, 'data')
-            os.makedirs(data_dir, exist_ok=True)
-            # Generate files for gnuplot.
-            output_gnuplot(report, nb_days, result_list, data_dir)
-            # Run gnuplot to generate the report.
-            os.system("cd %s; gnuplot %s" % (data_dir, 'gnuplot.script'))
-            # Move the report to the report directory.
-            os.system("mv %s.pdf %s" % (os.path.join(data_dir, report), report_dir))
+    elif my_opts.out == 'gnuplot':
+        output_gnuplot(my_opts.report, log_files)
 
 if __name__ == "__main__":
     main()